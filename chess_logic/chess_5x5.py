@@ -19,6 +19,15 @@ class MiniChess:
         '.': '.'
     }
 
+    @property
+    def board(self):
+        return self._board
+
+    @board.setter
+    def board(self, board):
+        self._board = board
+        self._material = None  # Recounted from the new board when next needed
+
     def reset(self):
         self.board = np.array([
             ['.', 'bR', 'bK', 'bB', '.'],
@@ -33,6 +42,16 @@ class MiniChess:
         self.state_history = defaultdict(int)
         self._record_state()
 
+    @classmethod
+    def from_board(cls, board, turn):
+        """Start a game from an arbitrary position (a 5x5 list of piece codes), with no history"""
+        game = cls()
+        game.board = np.array(board)
+        game.turn = turn
+        game.state_history = defaultdict(int)
+        game._record_state()
+        return game
+
     def display(self):
         print("    0 1 2 3 4") # The random spaces are needed in the display (for columns)
         for y in range(5):
@@ -50,6 +69,7 @@ class MiniChess:
     
     def set_piece(self, x, y, value):
         self.board[y][x] = value
+        self._material = None
 
     def is_game_over(self):
         return self.winner is not None
@@ -62,6 +82,18 @@ class MiniChess:
     
     def copy(self):
         return copy.deepcopy(self)
+
+    def search_copy(self):
+        """Cheap copy for search trees: copies board rows, history and piece counts, skips reset()"""
+        game = MiniChess.__new__(MiniChess)
+        game.board = [row.copy() for row in self.board]
+        # Set after the board, whose setter drops the counts, so children don't recount them
+        game._material = {color: defaultdict(int, counts) for color, counts in self._get_material().items()}
+        game.turn = self.turn
+        game.winner = self.winner
+        game.halfmove_clock = self.halfmove_clock
+        game.state_history = self.state_history.copy()
+        return game
     
     def _record_state(self):
         key = self._board_key()
@@ -150,38 +182,38 @@ class MiniChess:
         
         if self.winner:
             return False
-        
-        legal = False
-        for move in self.get_legal_moves():
-            if move == (from_pos, to_pos):
-                legal = True
-                break
-        if not legal:
-            return False
-        
+
         fx, fy = from_pos
         tx, ty = to_pos
+        if self.get_piece(fx, fy)[0] != self.turn:
+            return False
 
-        moving_piece = self.get_piece(fx, fy)
         target_piece = self.get_piece(tx, ty)
-                
-        old_board = [row.copy() for row in self.board]
-        old_turn = self.turn
-
         if target_piece != '.' and target_piece[1] == 'K':
-            return False    
+            return False
+
+        if not self._leaves_king_safe(from_pos, to_pos):
+            return False
+
+        return self.apply_move(from_pos, to_pos)
 
-        self.set_piece(tx, ty, moving_piece)
-        self.set_piece(fx, fy, '.')
+    def apply_move(self, from_pos, to_pos):
+        """Play a move that is already known to be legal (e.g. taken from get_legal_moves)
+        and update the result. Nothing is validated, untrusted moves go through make_move."""
+        fx, fy = from_pos
+        tx, ty = to_pos
+        material = self._get_material()
+
+        moving_piece = self.board[fy][fx]
+        target_piece = self.board[ty][tx]
+        self.board[ty][tx] = moving_piece
+        self.board[fy][fx] = '.'
 
         if target_piece != '.':
+            material[target_piece[0]][target_piece[1]] -= 1
             self.halfmove_clock = 0
         else:
             self.halfmove_clock += 1
-        
-        if all(old_board[i][j] == self.board[i][j] for i in range(5) for j in range(5)):
-            print(f"WARNING: Move {from_pos} to {to_pos} did not change board...")
-            return False
 
         self.turn = 'b' if self.turn == 'w' else 'w'
         if self._record_state():
@@ -197,8 +229,7 @@ class MiniChess:
             print("Draw by insufficient material")
             return True
         
-        legal_moves = self.get_legal_moves()
-        if not legal_moves:
+        if not self.has_legal_move():
             if self.is_in_check(self.turn):
                 # If no legal moves and in check -> checkmate
                 self.winner = 'w' if self.turn == 'b' else 'b'
@@ -206,8 +237,21 @@ class MiniChess:
                 self.winner = 'draw' # No check but also no legal moves -> stalemate
         return True
     
-    def get_legal_moves(self):
-        moves = []
+    def _leaves_king_safe(self, from_pos, to_pos):
+        """Check that a pseudo-legal move doesn't put or leave the mover's own king in check"""
+        fx, fy = from_pos
+        tx, ty = to_pos
+        # Try the move on the board itself and take it back, instead of copying the game
+        moving_piece = self.board[fy][fx]
+        target_piece = self.board[ty][tx]
+        self.board[ty][tx] = moving_piece
+        self.board[fy][fx] = '.'
+        safe = not self.is_in_check(self.turn)
+        self.board[fy][fx] = moving_piece
+        self.board[ty][tx] = target_piece
+        return safe
+
+    def _iter_legal_moves(self):
         for y in range(5):
             for x in range(5):
                 piece = self.get_piece(x, y)
@@ -215,37 +259,67 @@ class MiniChess:
                     for ty in range(5):
                         for tx in range(5):
                             if self.is_valid_move((x, y), (tx, ty)):
-                                temp_board = self.copy()
-                                moving_piece = temp_board.get_piece(x, y)
-                                temp_board.set_piece(tx, ty, moving_piece)
-                                temp_board.set_piece(x, y, '.')
-                                
                                 # Only add move if it doesn't put own king in check
-                                if not temp_board.is_in_check(self.turn):
-                                    moves.append(((x, y), (tx, ty)))
-        return moves
-    
-    def is_dead_position(self):
-        """Check for dead positions, which result in instant draws"""
-        pieces = {'w': [], 'b': []}
+                                if self._leaves_king_safe((x, y), (tx, ty)):
+                                    yield ((x, y), (tx, ty))
+
+    def get_legal_moves(self):
+        return list(self._iter_legal_moves())
+
+    def has_legal_move(self):
+        """Stops at the first legal move, for mate/stalemate detection"""
+        return next(self._iter_legal_moves(), None) is not None
+
+    def get_capture_moves(self):
+        """Legal captures only, for quiescence search.
+        When the side to move is in check every legal move is an evasion, so all of them are returned."""
+        if self.is_in_check(self.turn):
+            return self.get_legal_moves()
 
+        own, targets = [], []
         for y in range(5):
             for x in range(5):
                 piece = self.get_piece(x, y)
-                if piece != '.':
-                    pieces[piece[0]].append(piece[1])
+                if piece == '.':
+                    continue
+                if piece[0] == self.turn:
+                    own.append((x, y))
+                elif piece[1] != 'K':  # Kings are never captured, the game ends first
+                    targets.append((x, y))
+
+        moves = []
+        for from_pos in own:
+            for to_pos in targets:
+                if self.is_valid_move(from_pos, to_pos) and self._leaves_king_safe(from_pos, to_pos):
+                    moves.append((from_pos, to_pos))
+        return moves
+    
+    def _get_material(self):
+        """Piece counts per colour and type, kept up to date by apply_move"""
+        if self._material is None:
+            self._material = {'w': defaultdict(int), 'b': defaultdict(int)}
+            for y in range(5):
+                for x in range(5):
+                    piece = self.get_piece(x, y)
+                    if piece != '.':
+                        self._material[piece[0]][piece[1]] += 1
+        return self._material
 
-        pieces['w'].sort()
-        pieces['b'].sort()
+    def is_dead_position(self):
+        """Check for dead positions, which result in instant draws"""
+        material = self._get_material()
+        white_count = sum(material['w'].values())
+        black_count = sum(material['b'].values())
 
         # King v King:
-        if len(pieces['w']) == 1 and len(pieces['b']) == 1:
+        if white_count == 1 and black_count == 1:
             return True
         
         # King v Bishop + King:
-        if (len(pieces['w']) == 1 and len(pieces['b']) == 2 and 'B' in pieces['b']) or \
-           (len(pieces['b']) == 1 and len(pieces['w']) == 2 and 'B' in pieces['w']):
+        if (white_count == 1 and black_count == 2 and material['b']['B'] > 0) or \
+           (black_count == 1 and white_count == 2 and material['w']['B'] > 0):
             return True
+        return False
 
 
 
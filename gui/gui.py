@@ -35,6 +35,14 @@ def draw_start_button():
     
     return button
 
+def draw_status_text(text):
+    """Draw a status line (e.g. search progress) along the top of the board"""
+    font = pygame.font.Font(None, 28)
+    rendered = font.render(text, True, (255, 255, 255))
+    background = pygame.Rect(0, 0, WINDOW_SIZE, rendered.get_height() + 10)
+    pygame.draw.rect(SCREEN, (0, 0, 0), background)
+    SCREEN.blit(rendered, rendered.get_rect(midleft=(10, background.centery)))
+
 def load_pieces():
     pieces = {}
     piece_path = Path(__file__).parent / "assets" / "pieces"
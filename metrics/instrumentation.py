@@ -0,0 +1,163 @@
+"""Opt-in counters and timers for the engine, search and training hot paths.
+
+Nothing is wrapped until enable() is called, so a normal run pays no overhead at all.
+Once enabled every method in HOT_PATHS is replaced by a counting/timing wrapper and
+cumulative snapshots are appended to a MetricsWriter stream every few seconds.
+Read a stream back with scr/profiling/profile_report.py.
+"""
+import time
+import atexit
+import functools
+from collections import defaultdict
+from contextlib import contextmanager
+
+from chess_logic.chess_5x5 import MiniChess
+from models.minmax import MinimaxAI
+from models.qlearning import QLearningAgent
+from models.approx_qlearning import ApproxQLearningAgent
+from metrics.metrics_writer import MetricsWriter
+
+# (owner, method, subsystem, label) - choose_action/learn count agent calls, not Q-value reads:
+# each call reads one Q-value per legal move (of the new position, for learn). Search nodes are
+# split: 'nodes' counts minimax calls (horizon leaves included) and 'quiescence_nodes' counts
+# quiescence calls. Every horizon leaf starts one quiescence call on the same position, so
+# MinimaxAI.nodes (shown by match_sim) is nodes + quiescence_nodes - leaves.
+HOT_PATHS = [
+    (MiniChess, 'get_legal_moves', 'engine', 'get_legal_moves'),
+    (MiniChess, 'is_in_check', 'engine', 'is_in_check'),
+    (MiniChess, 'make_move', 'engine', 'make_move'),
+    (MiniChess, 'apply_move', 'engine', 'apply_move'),
+    (MiniChess, 'copy', 'engine', 'copy'),
+    (MinimaxAI, 'minimax', 'search', 'nodes'),
+    (MinimaxAI, 'quiescence', 'search', 'quiescence_nodes'),
+    (MinimaxAI, 'select_move', 'search', 'select_move'),
+    (QLearningAgent, 'choose_action', 'qtable', 'choose_action'),
+    (QLearningAgent, 'learn', 'qtable', 'learn'),
+    (ApproxQLearningAgent, 'choose_action', 'qtable', 'choose_action'),
+    (ApproxQLearningAgent, 'learn', 'qtable', 'learn'),
+    (ApproxQLearningAgent, 'q_values', 'qtable', 'approx_inference'),
+    (ApproxQLearningAgent, 'train_batch', 'qtable', 'approx_train_batch'),
+]
+
+_enabled = False
+_originals = []
+_calls = defaultdict(int)
+_seconds = defaultdict(float)
+_active = defaultdict(int)  # Recursion depth per key, so recursive calls aren't timed twice
+_stream = None
+_snapshot_interval = 10.0
+_last_snapshot = 0.0
+_started_at = 0.0
+
+def is_enabled():
+    return _enabled
+
+def _record(key, start, end, depth):
+    _calls[key] += 1
+    if depth == 0:
+        _seconds[key] += end - start
+    if end - _last_snapshot >= _snapshot_interval:
+        snapshot()
+
+def _wrap(func, key):
+    clock = time.perf_counter
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        depth = _active[key]
+        _active[key] = depth + 1
+        start = clock()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _active[key] = depth
+            _record(key, start, clock(), depth)
+    return wrapper
+
+@contextmanager
+def timer(subsystem, label):
+    """Time a block (e.g. one evaluation game); a no-op unless instrumentation is enabled"""
+    if not _enabled:
+        yield
+        return
+    key = (subsystem, label)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record(key, start, time.perf_counter(), 0)
+
+def enable(stream_path=None, snapshot_interval=10.0):
+    """Install the hot-path wrappers and optionally start a JSONL snapshot stream"""
+    global _enabled, _stream, _snapshot_interval, _last_snapshot, _started_at
+    if _enabled:
+        return
+    reset()
+    for owner, method, subsystem, label in HOT_PATHS:
+        original = owner.__dict__[method]
+        _originals.append((owner, method, original))
+        setattr(owner, method, _wrap(original, (subsystem, label)))
+
+    _snapshot_interval = snapshot_interval
+    _started_at = _last_snapshot = time.perf_counter()
+    if stream_path:
+        _stream = MetricsWriter(stream_path)
+    _enabled = True
+    print(f"[INFO] Instrumentation enabled (stream: {stream_path})")
+
+def disable():
+    """Write a final snapshot, close the stream and restore the original methods"""
+    global _enabled, _stream
+    if not _enabled:
+        return
+    snapshot()
+    for owner, method, original in _originals:
+        setattr(owner, method, original)
+    _originals.clear()
+    if _stream is not None:
+        _stream.close()
+        _stream = None
+    _enabled = False
+
+def reset():
+    _calls.clear()
+    _seconds.clear()
+    _active.clear()
+
+def snapshot():
+    """Cumulative counters since enable(); appended to the stream when one is open"""
+    global _last_snapshot
+    now = time.perf_counter()
+    _last_snapshot = now
+    data = {
+        'type': 'profile',
+        'time': time.time(),
+        'elapsed': now - _started_at,
+        'timers': {
+            f"{subsystem}.{label}": {'calls': _calls[(subsystem, label)], 'seconds': _seconds[(subsystem, label)]}
+            for subsystem, label in sorted(_calls)
+        }
+    }
+    if _stream is not None:
+        _stream.write(data)
+    return data
+
+def format_report(data):
+    """Per-subsystem breakdown of one snapshot. Times are inclusive of nested hot-path calls."""
+    elapsed = data['elapsed'] or 1e-9
+    by_subsystem = defaultdict(list)
+    for name, timer_data in data['timers'].items():
+        subsystem, label = name.split('.', 1)
+        by_subsystem[subsystem].append((label, timer_data))
+
+    lines = [f"Profile over {elapsed:.1f}s wall time (inclusive times)"]
+    for subsystem in sorted(by_subsystem):
+        lines.append(f"\n[{subsystem}]")
+        lines.append(f"  {'name':<16}{'calls':>12}{'total s':>11}{'mean us':>11}{'% wall':>9}")
+        for label, timer_data in sorted(by_subsystem[subsystem], key=lambda item: -item[1]['seconds']):
+            calls, seconds = timer_data['calls'], timer_data['seconds']
+            mean_us = seconds / calls * 1e6 if calls else 0.0
+            lines.append(f"  {label:<16}{calls:>12}{seconds:>11.2f}{mean_us:>11.1f}{seconds / elapsed:>9.1%}")
+    return "\n".join(lines)
+
+atexit.register(disable)
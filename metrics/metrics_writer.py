@@ -0,0 +1,67 @@
+"""Append-only JSONL metrics stream.
+
+write() only appends the record to an in-memory buffer; a background thread serialises and
+flushes the buffer every few seconds, so logging cost per record stays constant no matter
+how long a run gets. read_metrics()/load_columns() stream a file back for plotting.
+"""
+import json
+import threading
+
+class MetricsWriter:
+    def __init__(self, path, flush_interval=5.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._file = open(path, 'a')
+        self._thread = threading.Thread(target=self._flush_loop, daemon=True)
+        self._thread.start()
+
+    def write(self, record):
+        with self._lock:
+            self._buffer.append(record)
+
+    def flush(self):
+        with self._lock:
+            pending, self._buffer = self._buffer, []
+        if pending:
+            self._file.write(''.join(json.dumps(record) + "\n" for record in pending))
+            self._file.flush()
+
+    def close(self):
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self._thread.join()
+        self.flush()
+        self._file.close()
+
+    def _flush_loop(self):
+        while not self._closed.wait(self.flush_interval):
+            self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def read_metrics(path, record_type=None):
+    """Yield records one at a time, optionally only those with a matching 'type'"""
+    with open(path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                break  # Partially written tail of a run that is still going
+            if record_type is None or record.get('type') == record_type:
+                yield record
+
+def load_columns(path, fields, record_type=None):
+    """Collect the given fields into lists, e.g. for plotting reward against episode"""
+    columns = {field: [] for field in fields}
+    for record in read_metrics(path, record_type):
+        for field in fields:
+            columns[field].append(record.get(field))
+    return columns
@@ -0,0 +1,178 @@
+import time
+import pickle
+import cloudpickle
+import numpy as np
+from collections import deque
+from models.qlearning import QLearningAgent
+
+# Board encoding: each square holds a plane index (own K/R/B = 0-2, opponent K/R/B = 3-5) or -1
+PLANES = ['K', 'R', 'B']
+NUM_FEATURES = 2 * len(PLANES) * 25
+# Black's squares are mirrored top to bottom so both colours see the board from their own side
+MIRROR = np.array([(4 - y) * 5 + x for y in range(5) for x in range(5)])
+
+class ApproxQLearningAgent(QLearningAgent):
+    """Q-learning with a small NumPy MLP over board feature planes instead of a table.
+
+    Q(s, a) is the network's value of the position reached by playing a, seen from the mover's
+    side, so every legal move of a position is scored in one batched forward pass. Both colours
+    share the one value function, so the bootstrap target is in negamax form. Transitions
+    go into a fixed-size replay buffer and the network is trained by minibatch SGD, so memory
+    stays constant no matter how many positions are visited.
+    """
+    def __init__(self, alpha=0.01, gamma=0.99, epsilon=0.3, name="ApproxQ", hidden_size=64,
+                 buffer_size=20000, batch_size=64, train_every=4, weights=None, book=None, rng=None):
+        self.hidden_size = hidden_size
+        super().__init__(alpha, gamma, epsilon, name, q_table=weights, book=book, rng=rng)
+        self.batch_size = batch_size
+        self.train_every = train_every
+        self.replay = deque(maxlen=buffer_size)
+        self.steps = 0
+
+        # Per-move inference cost, see inference_stats()
+        self.inference_seconds = 0.0
+        self.inference_positions = 0
+        self.inference_moves = 0
+
+    def init_model(self, weights):
+        """Set up the Q-network in place of the parent's Q-table"""
+        if weights is not None:
+            print(f"[INFO] Loaded Q-network with hidden size {weights['W1'].shape[1]}.")
+            self.weights = weights
+        else:
+            print("[INFO] Initialized random Q-network.")
+            self.weights = {
+                'W1': self.rng.normal(0, np.sqrt(2 / NUM_FEATURES), (NUM_FEATURES, self.hidden_size)),
+                'b1': np.zeros(self.hidden_size),
+                'W2': self.rng.normal(0, np.sqrt(1 / self.hidden_size), self.hidden_size),
+                'b2': np.zeros(1)
+            }
+
+    def encode_board(self, game):
+        """Plane index per square from the side to move's perspective, as a (25,) int8 array"""
+        codes = np.full(25, -1, dtype=np.int8)
+        for y in range(5):
+            for x in range(5):
+                piece = game.get_piece(x, y)
+                if piece != '.':
+                    offset = 0 if piece[0] == game.turn else len(PLANES)
+                    codes[y * 5 + x] = offset + PLANES.index(piece[1])
+        if game.turn == 'b':
+            codes = codes[MIRROR]
+        return codes
+
+    def afterstate_codes(self, game, moves):
+        """Encoded boards after each move, built in one vectorised step as an (n, 25) array"""
+        codes = self.encode_board(game)
+        from_squares = np.array([fy * 5 + fx for (fx, fy), _ in moves])
+        to_squares = np.array([ty * 5 + tx for _, (tx, ty) in moves])
+        if game.turn == 'b':
+            from_squares = MIRROR[from_squares]
+            to_squares = MIRROR[to_squares]
+        rows = np.arange(len(moves))
+        after = np.tile(codes, (len(moves), 1))
+        after[rows, to_squares] = after[rows, from_squares]
+        after[rows, from_squares] = -1
+        return after
+
+    def features(self, codes):
+        """One-hot feature planes for a batch of encoded boards"""
+        rows, squares = np.nonzero(codes >= 0)
+        x = np.zeros((codes.shape[0], NUM_FEATURES))
+        x[rows, codes[rows, squares].astype(np.intp) * 25 + squares] = 1.0
+        return x
+
+    def forward(self, x):
+        w = self.weights
+        hidden = np.maximum(x @ w['W1'] + w['b1'], 0.0)
+        return hidden @ w['W2'] + w['b2'], hidden
+
+    def q_values(self, game, moves):
+        start = time.perf_counter()
+        q, _ = self.forward(self.features(self.afterstate_codes(game, moves)))
+        self.inference_seconds += time.perf_counter() - start
+        self.inference_positions += 1
+        self.inference_moves += len(moves)
+        return q
+
+    def choose_action(self, game):
+        if self.book is not None:
+            move = self.book.lookup(game)
+            if move:
+                return move
+
+        legal_moves = game.get_legal_moves()
+        if not legal_moves:
+            return None
+
+        if self.rng.random() < self.epsilon:
+            return legal_moves[self.rng.integers(len(legal_moves))]
+        q = self.q_values(game, legal_moves)
+        return legal_moves[int(np.argmax(q))]
+
+    def learn(self, old_game, action, reward, new_game):
+        after = self.afterstate_codes(old_game, [action])[0]
+        legal_moves = new_game.get_legal_moves()
+        next_after = self.afterstate_codes(new_game, legal_moves) if legal_moves else None
+        self.replay.append((after, reward, next_after))
+
+        self.steps += 1
+        if self.steps % self.train_every == 0 and len(self.replay) >= self.batch_size:
+            self.train_batch()
+
+    def train_batch(self):
+        """One SGD step on a random minibatch.
+
+        The next afterstates are scored from the opponent's side, who moves in new_game, so their
+        best value is subtracted: Q(s, a) = r - gamma * max Q(s', a').
+        """
+        indices = self.rng.choice(len(self.replay), self.batch_size, replace=False)
+        batch = [self.replay[i] for i in indices]
+        x = self.features(np.stack([after for after, _, _ in batch]))
+        rewards = np.array([reward for _, reward, _ in batch])
+
+        # Opponent's best reply to each transition, all in one forward pass
+        future_q = np.zeros(self.batch_size)
+        nonterminal = [i for i, (_, _, next_after) in enumerate(batch) if next_after is not None]
+        if nonterminal:
+            next_codes = [batch[i][2] for i in nonterminal]
+            starts = np.cumsum([0] + [len(codes) for codes in next_codes[:-1]])
+            next_q, _ = self.forward(self.features(np.concatenate(next_codes)))
+            future_q[nonterminal] = np.maximum.reduceat(next_q, starts)
+        targets = rewards - self.gamma * future_q
+
+        q, hidden = self.forward(x)
+        error = (q - targets) / self.batch_size
+        w = self.weights
+        grad_hidden = np.outer(error, w['W2']) * (hidden > 0)
+        w['W2'] -= self.alpha * hidden.T @ error
+        w['b2'] -= self.alpha * error.sum()
+        w['W1'] -= self.alpha * x.T @ grad_hidden
+        w['b1'] -= self.alpha * grad_hidden.sum(axis=0)
+
+    def inference_stats(self):
+        moves = max(self.inference_moves, 1)
+        positions = max(self.inference_positions, 1)
+        return {
+            'positions': self.inference_positions,
+            'moves': self.inference_moves,
+            'us_per_position': self.inference_seconds / positions * 1e6,
+            'us_per_move': self.inference_seconds / moves * 1e6
+        }
+
+    def table_size(self):
+        return sum(param.size for param in self.weights.values())
+
+    def model_state(self):
+        return self.weights
+
+    def load_state(self, state):
+        self.weights = state
+
+    def save(self, filename='q_network.pkl'):
+        with open(filename, 'wb') as f:
+            cloudpickle.dump(self.model_state(), f)
+
+    def load(self, filename='q_network.pkl'):
+        with open(filename, 'rb') as f:
+            self.load_state(pickle.load(f))
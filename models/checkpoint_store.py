@@ -0,0 +1,214 @@
+import os
+import re
+import json
+import time
+import zlib
+import pickle
+import hashlib
+import numpy as np
+
+NUM_CHUNKS = 64
+MAX_DELTA_CHAIN = 20  # Store a full snapshot once a checkpoint is this many deltas from one
+
+def _same_value(a, b):
+    if isinstance(a, np.ndarray) or isinstance(b, np.ndarray):
+        return isinstance(a, np.ndarray) and isinstance(b, np.ndarray) and np.array_equal(a, b)
+    return a == b
+
+class CheckpointStore:
+    """Content-addressed catalogue of model checkpoints.
+
+    A checkpoint with a parent is stored as a delta against it: only the entries that were
+    added or changed, plus the keys that were removed. Between checkpoints of one run only a
+    small fraction of a Q-table changes, so this is where most of the saving comes from. Every
+    MAX_DELTA_CHAIN deltas (and for checkpoints without a parent) a full snapshot is written
+    instead, split into NUM_CHUNKS buckets by a stable hash of each key. All chunks are
+    compressed and stored under the SHA-256 of their bytes, so identical chunks are stored once.
+    index.json holds the metadata of every checkpoint (episode, epsilon, table size, eval
+    results, hash, parent), so checkpoints can be listed and queried without unpickling a model.
+    """
+    def __init__(self, root='saved_models/store'):
+        self.root = root
+        self.chunk_dir = os.path.join(root, 'chunks')
+        self.index_path = os.path.join(root, 'index.json')
+        os.makedirs(self.chunk_dir, exist_ok=True)
+        self.entries = self._load_index()
+
+    def _load_index(self):
+        if not os.path.exists(self.index_path):
+            return {}
+        with open(self.index_path) as f:
+            return {entry['id']: entry for entry in json.load(f)}
+
+    def _save_index(self):
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(list(self.entries.values()), f, indent=1)
+        os.replace(tmp_path, self.index_path)  # Never leave a half-written index behind
+
+    def _chunk_path(self, digest):
+        return os.path.join(self.chunk_dir, digest[:2], digest)
+
+    @staticmethod
+    def _bucket(key):
+        return zlib.crc32(repr(key).encode()) % NUM_CHUNKS  # Unlike hash(), stable across runs
+
+    def _write_chunk(self, items):
+        data = zlib.compress(pickle.dumps(items, protocol=4))
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._chunk_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(data)
+        return digest, len(data)
+
+    def _read_chunk(self, digest):
+        with open(self._chunk_path(digest), 'rb') as f:
+            return pickle.loads(zlib.decompress(f.read()))
+
+    @staticmethod
+    def model_hash(model):
+        digest = hashlib.sha256()
+        for key, value in sorted(model.items()):
+            digest.update(pickle.dumps((key, value), protocol=4))
+        return digest.hexdigest()
+
+    def put(self, model, episode=None, epsilon=None, eval_results=None, parent=None, name=None, table_size=None,
+            parent_model=None):
+        """Store a model dict and return its index entry; storing an identical model again is a no-op.
+        `table_size` defaults to the number of entries, pass agent.table_size() for other models.
+        The parent is reassembled only for the diff, pass `parent_model` if it is already loaded."""
+        model_hash = self.model_hash(model)
+        checkpoint_id = f"ep{episode}-{model_hash[:8]}"
+        if checkpoint_id in self.entries:
+            return self.entries[checkpoint_id]
+
+        depth = 0
+        if parent is not None and self.entries[parent].get('depth', 0) + 1 < MAX_DELTA_CHAIN:
+            depth = self.entries[parent].get('depth', 0) + 1
+            base = parent_model if parent_model is not None else self.load(parent)
+            changed = [(key, value) for key, value in model.items()
+                       if key not in base or not _same_value(base[key], value)]
+            removed = [key for key in base if key not in model]
+            chunk_items = [(changed, removed)]
+        else:
+            buckets = [[] for _ in range(NUM_CHUNKS)]
+            for key, value in model.items():
+                buckets[self._bucket(key)].append((key, value))
+            chunk_items = [sorted(items) for items in buckets]
+
+        chunks, size_bytes = [], 0
+        for items in chunk_items:
+            digest, size = self._write_chunk(items)
+            chunks.append(digest)
+            size_bytes += size
+
+        entry = {
+            'id': checkpoint_id,
+            'name': name,
+            'episode': episode,
+            'epsilon': epsilon,
+            'table_size': table_size if table_size is not None else len(model),
+            'eval': eval_results or {},
+            'hash': model_hash,
+            'parent': parent,
+            'kind': 'delta' if depth else 'full',  # A delta applies on top of its parent
+            'depth': depth,
+            'chunks': chunks,
+            'size_bytes': size_bytes,
+            'created': time.time()
+        }
+        self.entries[checkpoint_id] = entry
+        self._save_index()
+        return entry
+
+    def load(self, checkpoint_id):
+        """Reassemble the model dict of a checkpoint, applying deltas on top of their parents"""
+        entry = self.entries[checkpoint_id]
+        if entry.get('kind') == 'delta':
+            model = self.load(entry['parent'])
+            changed, removed = self._read_chunk(entry['chunks'][0])
+            for key in removed:
+                del model[key]
+            model.update(changed)
+        else:
+            model = {}
+            for digest in entry['chunks']:
+                model.update(self._read_chunk(digest))
+        return model
+
+    def query(self, min_episode=None, max_episode=None, where=None):
+        """Index entries filtered by episode range and an optional predicate, oldest episode first"""
+        entries = []
+        for entry in self.entries.values():
+            episode = entry['episode']
+            if min_episode is not None and (episode is None or episode < min_episode):
+                continue
+            if max_episode is not None and (episode is None or episode > max_episode):
+                continue
+            if where is not None and not where(entry):
+                continue
+            entries.append(entry)
+        return sorted(entries, key=lambda entry: (entry['episode'] is None, entry['episode'] or 0))
+
+    def best(self, metric='win_rate'):
+        scored = [entry for entry in self.entries.values() if entry['eval'].get(metric) is not None]
+        if not scored:
+            return None
+        return max(scored, key=lambda entry: entry['eval'][metric])
+
+    def remove(self, checkpoint_id):
+        dependents = [entry['id'] for entry in self.entries.values()
+                      if entry.get('kind') == 'delta' and entry['parent'] == checkpoint_id]
+        if dependents:
+            raise ValueError(f"{checkpoint_id} is the delta base of {', '.join(dependents)}")
+        del self.entries[checkpoint_id]
+        self._save_index()
+
+    def gc(self):
+        """Delete chunks no checkpoint refers to; returns the number of bytes freed"""
+        referenced = {digest for entry in self.entries.values() for digest in entry['chunks']}
+        freed = 0
+        for prefix in os.listdir(self.chunk_dir):
+            for digest in os.listdir(os.path.join(self.chunk_dir, prefix)):
+                if digest not in referenced:
+                    path = self._chunk_path(digest)
+                    freed += os.path.getsize(path)
+                    os.remove(path)
+        return freed
+
+    def disk_usage(self):
+        total = 0
+        for prefix in os.listdir(self.chunk_dir):
+            for digest in os.listdir(os.path.join(self.chunk_dir, prefix)):
+                total += os.path.getsize(self._chunk_path(digest))
+        return total
+
+    @staticmethod
+    def legacy_metadata(filename):
+        """(episode, eval results) parsed from a checkpoint_ep<episode>_wr<win rate>.pkl name"""
+        match = re.search(r'checkpoint_ep(\d+)_wr([\d.]+)\.pkl$', filename)
+        if not match:
+            return None, {}
+        return int(match.group(1)), {'win_rate': float(match.group(2))}
+
+    def import_legacy(self, filename, candidates=()):
+        """Add a flat checkpoint file, taking metadata from its name.
+
+        Flat files carry no lineage, so the parent (and delta base) is whichever of the
+        `candidates` checkpoint ids differs from it in the fewest entries.
+        """
+        episode, eval_results = self.legacy_metadata(filename)
+        with open(filename, 'rb') as f:
+            model = pickle.load(f)
+
+        parent, parent_model, fewest = None, None, len(model)
+        for candidate in candidates:
+            base = self.load(candidate)
+            changes = sum(1 for key, value in model.items() if key not in base or not _same_value(base[key], value))
+            changes += sum(1 for key in base if key not in model)
+            if changes < fewest:
+                parent, parent_model, fewest = candidate, base, changes
+        return self.put(model, episode=episode, eval_results=eval_results, parent=parent,
+                        name=os.path.basename(filename), parent_model=parent_model)
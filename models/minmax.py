@@ -1,10 +1,18 @@
 from chess_logic.chess_5x5 import MiniChess
 
+class SearchCancelled(Exception):
+    """Raised inside minimax when the stop event is set mid-search"""
+    pass
+
 class MinimaxAI:
-    def __init__(self, depth=2, name="minmax"):
+    def __init__(self, depth=2, name="minmax", quiescence_depth=4, book=None):
         self.depth = depth
+        self.book = book  # Optional OpeningBook consulted before searching
+        self.quiescence_depth = quiescence_depth  # Max capture plies searched past depth 0, 0 disables
         self.name = name
         self.color = None
+        self.nodes = 0  # Nodes visited, read by the match_sim worker for progress
+        self.stop_event = None  # Optional threading.Event to abort a running search
 
     def evaluate(self, game):
         if self.color is None:
@@ -30,8 +38,15 @@ class MinimaxAI:
         return score
 
     def minimax(self, game, depth, maximizing):
-        if depth == 0 or game.is_game_over():
-            eval_score = self.evaluate(game)
+        self.nodes += 1
+        if self.stop_event is not None and self.stop_event.is_set():
+            raise SearchCancelled()
+
+        if game.is_game_over():
+            return self.evaluate(game), None
+
+        if depth == 0:
+            eval_score = self.quiescence(game, float('-inf'), float('inf'), maximizing, self.quiescence_depth)
             # print(f"Leaf node evaluation: {eval_score} at depth {depth}")
             return eval_score, None
 
@@ -45,7 +60,7 @@ class MinimaxAI:
             max_eval = float('-inf')
             for move in legal_moves:
                 new_game = self.copy_game(game)
-                new_game.make_move(*move)
+                new_game.apply_move(*move)
                 eval, _ = self.minimax(new_game, depth-1, False)
                 # print(f"Maximizing - Move: {move}, Eval: {eval}")
                 if eval > max_eval:
@@ -56,7 +71,7 @@ class MinimaxAI:
             min_eval = float('inf')
             for move in legal_moves:
                 new_game = self.copy_game(game)
-                new_game.make_move(*move)
+                new_game.apply_move(*move)
                 eval, _ = self.minimax(new_game, depth-1, True)
                 # print(f"Minimizing - Move: {move}, Eval: {eval}")
                 if eval < min_eval:
@@ -64,18 +79,60 @@ class MinimaxAI:
                     best_move = move
             return min_eval, best_move
 
+    def quiescence(self, game, alpha, beta, maximizing, depth):
+        """Resolve captures (and check evasions) past the horizon so leaves are scored in quiet positions"""
+        if self.stop_event is not None and self.stop_event.is_set():
+            raise SearchCancelled()
+
+        stand_pat = self.evaluate(game)
+        if depth == 0 or game.is_game_over():
+            return stand_pat
+
+        # The side to move may decline all captures, unless it is in check and has to respond
+        in_check = game.is_in_check(game.turn)
+        if not in_check:
+            if maximizing:
+                if stand_pat >= beta:
+                    return stand_pat
+                alpha = max(alpha, stand_pat)
+            else:
+                if stand_pat <= alpha:
+                    return stand_pat
+                beta = min(beta, stand_pat)
+
+        moves = game.get_capture_moves()
+        if not moves:
+            return stand_pat
+
+        if in_check:
+            best = float('-inf') if maximizing else float('inf')
+        else:
+            best = stand_pat
+        for move in moves:
+            new_game = self.copy_game(game)
+            new_game.apply_move(*move)
+            self.nodes += 1
+            score = self.quiescence(new_game, alpha, beta, not maximizing, depth - 1)
+            if maximizing:
+                best = max(best, score)
+                alpha = max(alpha, score)
+            else:
+                best = min(best, score)
+                beta = min(beta, score)
+            if alpha >= beta:
+                break
+        return best
+
     def copy_game(self, game):
-        new_game = MiniChess()
-        new_game.board = [row.copy() for row in game.board]  # Deep copy for 2D array
-        new_game.turn = game.turn
-        new_game.winner = game.winner
-        new_game.halfmove_clock = game.halfmove_clock
-        new_game.state_history = game.state_history.copy()
-        return new_game
+        return game.search_copy()
 
     def select_move(self, game):
         # print(f"\nMinMax selecting move for {game.turn} at depth {self.depth}")
         # print(f"Current board:\n{game.board}")
+        if self.book is not None:
+            move = self.book.lookup(game)
+            if move:
+                return move
         _, move = self.minimax(game, self.depth, game.turn == 'w')
         # print(f"Selected move {move} with evaluation {eval_score}")
         return move
@@ -0,0 +1,65 @@
+import hashlib
+import numpy as np
+
+class OpeningBook:
+    """Precomputed best moves for positions near the fixed start position.
+
+    Positions are keyed by a 64-bit hash of the board and side to move, and moves are
+    packed into a single square pair index, so the on-disk book is two flat arrays.
+    Build one with scr/opening_book/build_book.py.
+    """
+    def __init__(self, moves=None):
+        self.moves = moves if moves is not None else {}
+
+    def __len__(self):
+        return len(self.moves)
+
+    @staticmethod
+    def _hash_key(rows, turn):
+        key = ''.join(''.join(row) for row in rows) + turn
+        return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'big')
+
+    @classmethod
+    def position_hash(cls, game):
+        return cls._hash_key(game.board, game.turn)
+
+    @classmethod
+    def position_hash_after(cls, game, move):
+        """position_hash of the position after move, without copying the game to play it"""
+        (fx, fy), (tx, ty) = move
+        rows = [list(row) for row in game.board]
+        rows[ty][tx], rows[fy][fx] = rows[fy][fx], '.'
+        return cls._hash_key(rows, 'b' if game.turn == 'w' else 'w')
+
+    @staticmethod
+    def pack_move(move):
+        (fx, fy), (tx, ty) = move
+        return (fy * 5 + fx) * 25 + ty * 5 + tx
+
+    @staticmethod
+    def unpack_move(code):
+        from_square, to_square = divmod(int(code), 25)
+        return (from_square % 5, from_square // 5), (to_square % 5, to_square // 5)
+
+    def add(self, game, move):
+        self.moves[self.position_hash(game)] = self.pack_move(move)
+
+    def lookup(self, game):
+        """Book move for this position, or None when the position is out of book"""
+        code = self.moves.get(self.position_hash(game))
+        if code is None:
+            return None
+        move = self.unpack_move(code)
+        if not game.is_valid_move(*move):  # Guard against a hash collision
+            return None
+        return move
+
+    def save(self, filename='opening_book.npz'):
+        hashes = np.fromiter(self.moves.keys(), dtype=np.uint64, count=len(self.moves))
+        moves = np.fromiter(self.moves.values(), dtype=np.uint16, count=len(self.moves))
+        np.savez_compressed(filename, hashes=hashes, moves=moves)
+
+    @classmethod
+    def load(cls, filename='opening_book.npz'):
+        data = np.load(filename)
+        return cls(dict(zip(data['hashes'].tolist(), data['moves'].tolist())))
@@ -1,44 +1,83 @@
-import random
+import heapq
+import numpy as np
 import pickle
 import cloudpickle
-from collections import defaultdict
+from itertools import islice
 from chess_logic.chess_5x5 import MiniChess
 
+# Reward shaping terms of evaluate_position, precomputed so get_reward can score a move from
+# the squares it touches instead of scanning both boards
+PIECE_VALUES = {'K': 0, 'R': 5, 'B': 3}
+CENTER_BONUS = 0.2
+KING_SAFETY_BONUS = 0.1  # Per friendly piece next to the king, scaled by the king's value
+
+def build_piece_square(piece_values, center_bonus=CENTER_BONUS):
+    """Value of each piece type on each square (material times centre bonus), indexed [type][y][x]"""
+    return {
+        piece_type: [[value * (1.0 + (center_bonus if 1 <= x <= 3 and 1 <= y <= 3 else 0.0)) for x in range(5)]
+                     for y in range(5)]
+        for piece_type, value in piece_values.items()
+    }
+
+PIECE_SQUARE = build_piece_square(PIECE_VALUES)
+EMPTY_SQUARE_TABLE = [[0.0] * 5 for _ in range(5)]  # Piece types without a value
+NEIGHBOURS = [[tuple((x + dx, y + dy) for dx, dy in [(0,1), (1,0), (0,-1), (-1,0), (1,1), (-1,1), (1,-1), (-1,-1)]
+                     if 0 <= x + dx < 5 and 0 <= y + dy < 5) for x in range(5)] for y in range(5)]
+
 class QLearningAgent:
-    def __init__(self, alpha=0.1, gamma=0.99, epsilon=0.3, name="Q", q_table=None):
-        self.q_table = defaultdict(float)
+    def __init__(self, alpha=0.1, gamma=0.99, epsilon=0.3, name="Q", q_table=None, book=None,
+                 max_entries=None, eviction_policy='lru', rng=None):
         self.alpha = alpha
         self.gamma = gamma
         self.epsilon = epsilon
         self.name = name
         self.seen_states = set()
+        self.book = book  # Optional OpeningBook, played instead of the Q-table while in book
+        self._log_file = None  # Opened on first write_to_file and kept open
+        self.rng = np.random.default_rng(rng)  # Seed, SeedSequence or Generator; None is unseeded
 
+        # Bounded memory: once the table holds more than max_entries, the least recently
+        # updated ('lru') or least visited ('visits') entries are evicted. Reads never insert,
+        # a missing entry simply has Q-value 0.
+        self.max_entries = max_entries
+        self.eviction_policy = eviction_policy
+        self.evictions = 0
+        self.init_model(q_table)
+
+    def init_model(self, q_table):
+        """Set up the Q-table; agents that learn a different model override this"""
+        self.visit_counts = {}
         if q_table is not None:
             print(f"[INFO] Loaded Q-table with {len(q_table)} entries.")
-            self.q_table = defaultdict(float, q_table)
+            self.q_table = dict(q_table)
         else:
             print("[INFO] Initialized empty Q-table.")
-            self.q_table = defaultdict(float)
+            self.q_table = {}
 
     def get_state_key(self, game):
         return ''.join(''.join(row) for row in game.board) + game.turn
 
     def choose_action(self, game):
+        if self.book is not None:
+            move = self.book.lookup(game)
+            if move:
+                return move
+
         state = self.get_state_key(game)
         legal_moves = game.get_legal_moves()
         if not legal_moves:
             return None
 
         # Add debugging information
-        q_vals = [(self.q_table[(state, move)], move) for move in legal_moves]
+        q_vals = [(self.q_table.get((state, move), 0.0), move) for move in legal_moves]
 
-        if random.random() < self.epsilon:
-            chosen_move = random.choice(legal_moves)
+        if self.rng.random() < self.epsilon:
+            chosen_move = legal_moves[self.rng.integers(len(legal_moves))]
             return chosen_move
         else:
             max_q = max(q_vals, key=lambda x: x[0])[0]
             best_moves = [move for q, move in q_vals if q == max_q]
-            chosen_move = random.choice(best_moves)
+            chosen_move = best_moves[self.rng.integers(len(best_moves))]
             return chosen_move
         
     def learn(self, old_game, action, reward, new_game):
@@ -47,20 +86,49 @@ class QLearningAgent:
         legal_moves = new_game.get_legal_moves()
 
         if legal_moves:
-            future_q = max([self.q_table[(new_state, move)] for move in legal_moves])
+            future_q = max([self.q_table.get((new_state, move), 0.0) for move in legal_moves])
         else:
             future_q = 0
 
-        old_q = self.q_table[(old_state, action)]
-        self.q_table[(old_state, action)] += self.alpha * (reward + self.gamma * future_q - old_q)
+        key = (old_state, action)
+        old_q = self.q_table.pop(key, 0.0)  # Re-inserted below, so dict order is update order
+        self.q_table[key] = old_q + self.alpha * (reward + self.gamma * future_q - old_q)
+        self.visit_counts[key] = self.visit_counts.get(key, 0) + 1
+
+        if self.max_entries is not None and len(self.q_table) > self.max_entries:
+            self.evict()
+
+    def evict(self):
+        """Shrink the table to 90% of max_entries, so eviction runs in amortised batches"""
+        count = len(self.q_table) - int(self.max_entries * 0.9)
+        if self.eviction_policy == 'visits':
+            victims = heapq.nsmallest(count, self.q_table, key=lambda key: self.visit_counts.get(key, 0))
+        else:
+            victims = list(islice(self.q_table, count))  # Oldest updates come first
+
+        for key in victims:
+            del self.q_table[key]
+            self.visit_counts.pop(key, None)
+        self.evictions += len(victims)
+
+    def table_size(self):
+        return len(self.q_table)
+
+    def model_state(self):
+        """The learned model as a plain dict, as stored in checkpoints"""
+        return dict(self.q_table)
+
+    def load_state(self, state):
+        self.q_table = dict(state)
+        self.visit_counts = {}
 
     def save(self, filename='q_table.pkl'):
         with open(filename, 'wb') as f:
-            cloudpickle.dump(dict(self.q_table), f)
+            cloudpickle.dump(self.model_state(), f)
 
     def load(self, filename='q_table.pkl'):
         with open(filename, 'rb') as f:
-            self.q_table = defaultdict(float, pickle.load(f))
+            self.load_state(pickle.load(f))
 
     def train(self, episodes=10000):
         for episode in range(episodes):
@@ -84,19 +152,18 @@ class QLearningAgent:
 
     def evaluate_position(self, game, perspective):
         """Evaluate board position from given color's perspective"""
-        piece_values = {'K': 0, 'R': 5, 'B': 3}
         score = 0
         
         for y in range(5):
             for x in range(5):
                 piece = game.get_piece(x, y)
                 if piece != '.':
-                    value = piece_values.get(piece[1], 0)
+                    value = PIECE_VALUES.get(piece[1], 0)
                     multiplier = 1.0
                     
                     # Bonus for controlling center
                     if 1 <= x <= 3 and 1 <= y <= 3:
-                        multiplier += 0.2
+                        multiplier += CENTER_BONUS
                     
                     # Bonus for protecting king
                     if piece[1] == 'K':
@@ -106,7 +173,7 @@ class QLearningAgent:
                                 nearby = game.get_piece(x+dx, y+dy)
                                 if nearby != '.' and nearby[0] == piece[0]:
                                     friendly_pieces_nearby += 1
-                        multiplier += friendly_pieces_nearby * 0.1
+                        multiplier += friendly_pieces_nearby * KING_SAFETY_BONUS
                     
                     final_value = value * multiplier
                     # Score relative to perspective
@@ -117,18 +184,49 @@ class QLearningAgent:
         
         return score
 
+    def position_delta(self, old_game, action, perspective):
+        """evaluate_position after the move minus before it, computed from the move alone"""
+        (fx, fy), (tx, ty) = action
+        moving = old_game.get_piece(fx, fy)
+        captured = old_game.get_piece(tx, ty)
+
+        table = PIECE_SQUARE.get(moving[1], EMPTY_SQUARE_TABLE)
+        delta = table[ty][tx] - table[fy][fx]
+        if moving[0] != perspective:
+            delta = -delta
+        if captured != '.':
+            lost = PIECE_SQUARE.get(captured[1], EMPTY_SQUARE_TABLE)[ty][tx]
+            delta += lost if captured[0] != perspective else -lost
+
+        # King safety only changes around the two kings, and is worth nothing at king value 0
+        king_weight = PIECE_VALUES['K'] * KING_SAFETY_BONUS
+        if king_weight:
+            def piece_after(x, y):
+                if (x, y) == (tx, ty):
+                    return moving
+                if (x, y) == (fx, fy):
+                    return '.'
+                return old_game.get_piece(x, y)
+
+            for color in 'wb':
+                king = color + 'K'
+                king_before = next(((x, y) for y in range(5) for x in range(5) if old_game.get_piece(x, y) == king), None)
+                if king_before is None:
+                    continue
+                king_after = (tx, ty) if moving == king else king_before
+                before = sum(1 for x, y in NEIGHBOURS[king_before[1]][king_before[0]]
+                             if old_game.get_piece(x, y)[0] == color)
+                after = sum(1 for x, y in NEIGHBOURS[king_after[1]][king_after[0]]
+                            if piece_after(x, y)[0] == color)
+                change = king_weight * (after - before)
+                delta += change if color == perspective else -change
+        return delta
+
     def get_reward(self, old_game, action, new_game, agent_color):
-        """Calculate reward based on action's effect"""
-        # Check for illegal moves
-        if not old_game.is_valid_move(*action):
-            return -5.0
-        
-        # Get position evaluations from agent's perspective
-        old_score = self.evaluate_position(old_game, agent_color)
-        new_score = self.evaluate_position(new_game, agent_color)
-        
-        # Base reward is the improvement in position
-        reward = new_score - old_score
+        """Calculate reward based on action's effect.
+        `action` is the move that took old_game to new_game, so it is already known to be legal."""
+        # Base reward is the improvement in position, from the agent's perspective
+        reward = self.position_delta(old_game, action, agent_color)
         
         # Penalize repeated states
         new_state = self.get_state_key(new_game)
@@ -151,6 +249,17 @@ class QLearningAgent:
         
         return reward
     
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_log_file'] = None  # Open files can't be pickled into evaluation workers
+        return state
+
     def write_to_file(self, text):
-        with open(f"{self.name}_output.txt", "a") as f:
-            f.write(text)
\ No newline at end of file
+        if self._log_file is None:
+            self._log_file = open(f"{self.name}_output.txt", "a")
+        self._log_file.write(text)
+
+    def close_log(self):
+        if self._log_file is not None:
+            self._log_file.close()
+            self._log_file = None
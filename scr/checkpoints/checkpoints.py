@@ -0,0 +1,72 @@
+import sys
+import glob
+import argparse
+from pathlib import Path
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+import cloudpickle
+from models.checkpoint_store import CheckpointStore
+
+IMPORT_CANDIDATES = 4  # Recent imports tried as the delta base of each legacy file
+
+def print_entries(entries):
+    print(f"{'id':<22}{'episode':>9}{'epsilon':>9}{'entries':>10}{'win rate':>10}{'KiB':>9}  parent")
+    for entry in entries:
+        epsilon = f"{entry['epsilon']:.3f}" if entry['epsilon'] is not None else '-'
+        win_rate = entry['eval'].get('win_rate')
+        win_rate = f"{win_rate:.2f}" if win_rate is not None else '-'
+        print(f"{entry['id']:<22}{str(entry['episode']):>9}{epsilon:>9}{entry['table_size']:>10}"
+              f"{win_rate:>10}{entry['size_bytes'] / 1024:>9.0f}  {entry['parent'] or '-'}")
+
+def main():
+    parser = argparse.ArgumentParser(description="List, query and import checkpoints in the checkpoint store")
+    parser.add_argument('--store', default='saved_models/store')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    list_parser = commands.add_parser('list', help="List checkpoints from the index")
+    list_parser.add_argument('--min-episode', type=int)
+    list_parser.add_argument('--max-episode', type=int)
+    list_parser.add_argument('--min-win-rate', type=float)
+
+    best_parser = commands.add_parser('best', help="Show the checkpoint with the best eval metric")
+    best_parser.add_argument('--metric', default='win_rate')
+
+    import_parser = commands.add_parser('import', help="Import flat .pkl checkpoints into the store")
+    import_parser.add_argument('paths', nargs='+')
+
+    export_parser = commands.add_parser('export', help="Write a checkpoint back out as a flat .pkl file")
+    export_parser.add_argument('id')
+    export_parser.add_argument('path')
+
+    commands.add_parser('gc', help="Delete chunks no checkpoint refers to")
+    args = parser.parse_args()
+
+    store = CheckpointStore(args.store)
+    if args.command == 'list':
+        where = None
+        if args.min_win_rate is not None:
+            where = lambda entry: entry['eval'].get('win_rate', -1) >= args.min_win_rate
+        print_entries(store.query(args.min_episode, args.max_episode, where))
+    elif args.command == 'best':
+        entry = store.best(args.metric)
+        print_entries([entry] if entry else [])
+    elif args.command == 'import':
+        filenames = sorted({filename for pattern in args.paths for filename in glob.glob(pattern)},
+                           key=lambda filename: (store.legacy_metadata(filename)[0] is None,
+                                                 store.legacy_metadata(filename)[0] or 0, filename))
+        recent = []  # Parent candidates: the last few imports, which may come from different runs
+        for filename in filenames:
+            entry = store.import_legacy(filename, candidates=recent)
+            recent = (recent + [entry['id']])[-IMPORT_CANDIDATES:]
+            print(f"{filename} -> {entry['id']} ({entry['kind']}, parent {entry['parent']})")
+        print(f"Store size: {store.disk_usage() / 1024:.0f} KiB")
+    elif args.command == 'export':
+        with open(args.path, 'wb') as f:
+            cloudpickle.dump(store.load(args.id), f)
+        print(f"Wrote {args.id} to {args.path}")
+    elif args.command == 'gc':
+        print(f"Freed {store.gc() / 1024:.0f} KiB")
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,7 @@
 import sys
 import time
+import queue
+import threading
 from pathlib import Path
 import pygame
 
@@ -7,12 +9,96 @@ PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
 sys.path.append(str(PROJECT_ROOT))
 
 from chess_logic.chess_5x5 import MiniChess
-from models.minmax import MinimaxAI
+from models.minmax import MinimaxAI, SearchCancelled
 from models.qlearning import QLearningAgent
-from gui.gui import drawGrid, pygame, signal_game_end, draw_start_button
+from models.opening_book import OpeningBook
+from gui.gui import drawGrid, pygame, signal_game_end, draw_start_button, draw_status_text
 
-def simulate_match(agent1, agent2, delay=1.0):
-    """Simulates a match between two agents with GUI visualization"""
+class SearchWorker:
+    """Computes one agent move on a background thread and posts messages back through a queue"""
+    def __init__(self, agent, game, timeout=None):
+        self.agent = agent
+        self.game = game.copy()  # The render loop keeps drawing the original
+        self.timeout = timeout
+        self.messages = queue.Queue()
+        self.stop_event = threading.Event()
+        self.started_at = None
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.started_at = time.time()
+        self.thread.start()
+
+    def cancel(self):
+        self.stop_event.set()
+
+    def timed_out(self):
+        return self.timeout is not None and time.time() - self.started_at >= self.timeout
+
+    def poll(self):
+        """Drain all pending messages without blocking"""
+        messages = []
+        while True:
+            try:
+                messages.append(self.messages.get_nowait())
+            except queue.Empty:
+                return messages
+
+    def _run(self):
+        try:
+            if isinstance(self.agent, MinimaxAI):
+                move = self._search_minimax()
+            else:
+                move = self.agent.choose_action(self.game)
+            self.messages.put(('move', move))
+        except Exception as e:
+            self.messages.put(('error', e))
+
+    def _search_minimax(self):
+        """Iterative deepening up to the agent's depth, keeping the best fully searched move"""
+        agent = self.agent
+        if agent.book is not None:
+            move = agent.book.lookup(self.game)
+            if move:
+                return move
+
+        maximizing = self.game.turn == 'w'
+        if agent.color is None:
+            # Pin the perspective the full-depth search in select_move would pick at its
+            # first leaf, so the shallow iterations don't fix it to the other side
+            opponent = 'b' if self.game.turn == 'w' else 'w'
+            agent.color = self.game.turn if agent.depth % 2 == 0 else opponent
+
+        agent.nodes = 0
+        best_move = None
+        try:
+            for depth in range(1, agent.depth + 1):
+                _, move = agent.minimax(self.game, depth, maximizing)
+                best_move = move
+                elapsed = max(time.time() - self.started_at, 1e-9)
+                self.messages.put(('progress', depth, agent.nodes, agent.nodes / elapsed))
+                # Depth 1 always finishes, so there is a searched move to fall back on
+                agent.stop_event = self.stop_event
+        except SearchCancelled:
+            pass
+        finally:
+            agent.stop_event = None
+        return best_move
+
+def thinking_text(agent, progress):
+    """Status line for the agent currently searching (progress is only posted by minimax)"""
+    if progress is None:
+        return f"{agent.name} thinking..."
+    depth, nodes, nps = progress
+    return f"{agent.name} depth {depth}/{agent.depth} | {nodes} nodes | {nps:.0f} n/s"
+
+def simulate_match(agent1, agent2, delay=1.0, timeout=None):
+    """Simulates a match between two agents with GUI visualization.
+
+    Moves are computed by a SearchWorker so the window keeps rendering (and can be closed)
+    while an agent thinks. Escape cancels the current search; a search running longer than
+    `timeout` seconds is cancelled as well. Either way the best fully searched move is played.
+    """
     pygame.init()
     clock = pygame.time.Clock()
     game = MiniChess()
@@ -20,10 +106,15 @@ def simulate_match(agent1, agent2, delay=1.0):
     game_started = False
     game_ended = False
     winner = None
+    worker = None
+    progress = None
+    next_move_at = 0
 
     while running:
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
+                if worker:
+                    worker.cancel()
                 running = False
                 pygame.quit()
                 sys.exit()
@@ -32,6 +123,9 @@ def simulate_match(agent1, agent2, delay=1.0):
                 if start_button.collidepoint(event.pos):
                     game_started = True
                     print("Match started!")
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE and worker:
+                print(f"Search cancelled for {worker.agent.name}")
+                worker.cancel()
 
         if not game_started:
             drawGrid(game)
@@ -67,27 +161,47 @@ def simulate_match(agent1, agent2, delay=1.0):
             continue
 
         # Game logic for moves
-        drawGrid(game)
-        pygame.display.flip()
-
         current_agent = agent1 if game.turn == 'w' else agent2
-        move = current_agent.select_move(game) if isinstance(current_agent, MinimaxAI) else current_agent.choose_action(game)
-        
-        if move:
-            print(f"Player {game.turn} ({current_agent.name}) moves: {move}")
-            game.make_move(*move)
-            
-            drawGrid(game)
-            pygame.display.flip()
-            time.sleep(delay)
+        if worker is None:
+            if time.time() >= next_move_at:
+                worker = SearchWorker(current_agent, game, timeout)
+                worker.start()
+                progress = None
         else:
-            print(f"No valid moves for {current_agent.name}")
-            game_ended = True
+            if worker.timed_out() and not worker.stop_event.is_set():
+                print(f"Search timed out for {current_agent.name}")
+                worker.cancel()
 
+            for message in worker.poll():
+                if message[0] == 'progress':
+                    progress = message[1:]
+                elif message[0] == 'error':
+                    raise message[1]
+                elif message[0] == 'move':
+                    move = message[1]
+                    worker = None
+                    if move:
+                        print(f"Player {game.turn} ({current_agent.name}) moves: {move}")
+                        game.make_move(*move)
+                        next_move_at = time.time() + delay
+                    else:
+                        print(f"No valid moves for {current_agent.name}")
+                        game_ended = True
+
+        drawGrid(game)
+        if worker is not None:
+            draw_status_text(thinking_text(current_agent, progress))
+        pygame.display.flip()
         clock.tick(60)
 
 def main():
-    minimax = MinimaxAI(depth=1, name="Minimax")
+    try:
+        book = OpeningBook.load("saved_models/opening_book.npz")
+        print(f"Loaded opening book with {len(book)} positions")
+    except FileNotFoundError:
+        book = None
+
+    minimax = MinimaxAI(depth=1, name="Minimax", book=book)
     qlearner = QLearningAgent(name="Q-Learner")
     
     try:
@@ -97,7 +211,7 @@ def main():
         print("No trained model found, using untrained Q-Learning agent")
 
     print("Starting match simulation...")
-    simulate_match(qlearner, minimax, delay=1.5)
+    simulate_match(qlearner, minimax, delay=1.5, timeout=10.0)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
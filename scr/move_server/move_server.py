@@ -0,0 +1,37 @@
+import sys
+import asyncio
+import argparse
+from pathlib import Path
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from models.qlearning import QLearningAgent
+from models.approx_qlearning import ApproxQLearningAgent
+from models.checkpoint_store import CheckpointStore
+from serving.move_server import MoveServer
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve best moves from one warm agent over a local socket")
+    parser.add_argument('--checkpoint', default='saved_models/best_model.pkl', help="Flat .pkl checkpoint")
+    parser.add_argument('--store-id', help="Load this checkpoint id from the checkpoint store instead")
+    parser.add_argument('--store', default='saved_models/store')
+    parser.add_argument('--agent', choices=['tabular', 'approx'], default='tabular')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', help="Listen on this Unix socket path instead of TCP")
+    args = parser.parse_args()
+
+    agent = ApproxQLearningAgent(name="server") if args.agent == 'approx' else QLearningAgent(name="server")
+    if args.store_id:
+        agent.load_state(CheckpointStore(args.store).load(args.store_id))
+    else:
+        agent.load(args.checkpoint)
+    print(f"[INFO] Loaded {args.store_id or args.checkpoint}")
+
+    try:
+        asyncio.run(MoveServer(agent).serve(args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import sys
+import time
+from pathlib import Path
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from chess_logic.chess_5x5 import MiniChess
+from models.minmax import MinimaxAI
+from models.opening_book import OpeningBook
+
+# Book parameters
+BOOK_PLIES = 3      # Every position reachable in this many plies from the start gets a book move
+SEARCH_DEPTH = 3    # Minimax depth used to pick each book move
+BOOK_PATH = "saved_models/opening_book.npz"
+
+def best_move(game, depth):
+    """Deep search from the side to move's own perspective"""
+    searcher = MinimaxAI(depth=depth, name="book")
+    searcher.color = game.turn
+    _, move = searcher.minimax(game, depth, True)
+    return move
+
+def build_book(plies=BOOK_PLIES, depth=SEARCH_DEPTH):
+    """Breadth-first over all lines from the start position, searching each new position once"""
+    book = OpeningBook()
+    frontier = [MiniChess()]
+    seen = {book.position_hash(frontier[0])}
+    start_time = time.time()
+
+    for ply in range(plies):
+        next_frontier = []
+        for game in frontier:
+            if game.is_game_over():
+                continue
+
+            move = best_move(game, depth)
+            if move:
+                book.add(game, move)
+
+            if ply == plies - 1:
+                continue  # Children of the last ply would never be searched
+            for legal_move in game.get_legal_moves():
+                # Transpositions are dropped by hash before paying for a copy
+                position = book.position_hash_after(game, legal_move)
+                if position in seen:
+                    continue
+                seen.add(position)
+                child = game.copy()
+                child.apply_move(*legal_move)
+                next_frontier.append(child)
+        frontier = next_frontier
+        print(f"Ply {ply + 1}/{plies}: {len(book)} book positions ({time.time() - start_time:.0f}s)")
+    return book
+
+def main():
+    book = build_book()
+    book.save(BOOK_PATH)
+    print(f"Saved {len(book)} positions to {BOOK_PATH}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+import sys
+from pathlib import Path
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from metrics.instrumentation import format_report
+from metrics.metrics_writer import read_metrics
+
+def load_last_snapshot(path):
+    """Snapshots are cumulative, so the last one holds the whole run"""
+    last = None
+    for last in read_metrics(path, 'profile'):
+        pass
+    return last
+
+def main():
+    if len(sys.argv) != 2:
+        print("Usage: python scr/profiling/profile_report.py <profile.jsonl>")
+        sys.exit(1)
+
+    data = load_last_snapshot(sys.argv[1])
+    if data is None:
+        print("No snapshots found")
+        sys.exit(1)
+    print(format_report(data))
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,11 @@
 import os
-import random
 import sys
 import time
 import math
-import json
 import traceback
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
 PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
 sys.path.append(str(PROJECT_ROOT))
 
@@ -15,12 +15,28 @@ print(f"Python path: {sys.path}")
 from chess_logic.chess_5x5 import MiniChess
 from models.minmax import MinimaxAI
 from models.qlearning import QLearningAgent
+from models.approx_qlearning import ApproxQLearningAgent
+from models.opening_book import OpeningBook
+from models.checkpoint_store import CheckpointStore
+from metrics import instrumentation
+from metrics.metrics_writer import MetricsWriter
 
 # Training parameters
 TOTAL_EPISODES = 25000
 INITIAL_EPSILON = 1.0
 MIN_EPSILON = 0.1
 EPSILON_DECAY = 0.99975
+AGENT_TYPE = "tabular"  # "tabular" or "approx" (NumPy Q-network, constant memory)
+MAX_TABLE_ENTRIES = 2_000_000  # Tabular memory ceiling, least recently updated entries are evicted
+SEED = 0  # Root seed, every random stream of the run is derived from it
+EVAL_WORKERS = 1  # Processes used for evaluation games, results don't depend on this
+
+CHECKPOINT_DIR = "saved_models"
+METRICS_PATH = f"{CHECKPOINT_DIR}/training_metrics.jsonl"
+BOOK_PATH = f"{CHECKPOINT_DIR}/opening_book.npz"  # Built by scr/opening_book/build_book.py
+
+# Set PROFILE_METRICS=<path.jsonl> to enable hot-path instrumentation for the run
+PROFILE_PATH = os.environ.get("PROFILE_METRICS")
 
 def is_improvement(prev_win_rate, new_win_rate, n_games=500):
     """Check if improvement is statistically significant"""
@@ -29,44 +45,100 @@ def is_improvement(prev_win_rate, new_win_rate, n_games=500):
     std_error = math.sqrt(prev_win_rate * (1 - prev_win_rate) / n_games)
     return new_win_rate > prev_win_rate + 2 * std_error  # 95% confidence
 
-def evaluate_agent(agent, opponent_depth, num_games=500):
-    """Evaluate agent performance over specified number of games"""
+def load_book():
+    if os.path.exists(BOOK_PATH):
+        return OpeningBook.load(BOOK_PATH)
+    return None
+
+def play_evaluation_games(agent, opponent_depth, game_nums, seed, book=None, on_result=None):
+    """Play the given evaluation games and return their winners.
+
+    Each game gets a fresh opponent and an agent random stream derived from (seed, game number)
+    alone, so a game plays out the same no matter which process runs it or in what order.
+    `seed` is an int or a SeedSequence. `on_result(game_num, winner)` is called as each game ends.
+    """
+    base_seed = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    agent_rng = agent.rng
+    winners = []
+    try:
+        for game_num in game_nums:
+            agent.rng = np.random.default_rng(
+                np.random.SeedSequence(base_seed.entropy, spawn_key=base_seed.spawn_key + (game_num,)))
+            minimax = MinimaxAI(depth=opponent_depth, book=book)
+            game = MiniChess()
+            q_plays_white = game_num % 2 == 0
+
+            with instrumentation.timer('evaluation', 'game'):
+                while not game.is_game_over():
+                    if (game.turn == 'w') == q_plays_white:
+                        move = agent.choose_action(game)
+                    else:
+                        move = minimax.select_move(game)
+
+                    if move is None:
+                        break
+
+                    game.make_move(*move)
+            winners.append(game.get_winner())
+            if on_result is not None:
+                on_result(game_num, game.get_winner())
+    finally:
+        agent.rng = agent_rng
+    return winners
+
+# Evaluation worker processes get the agent and book once, through the pool initializer
+_eval_agent = None
+_eval_book = None
+
+def init_eval_worker(agent, book):
+    global _eval_agent, _eval_book
+    _eval_agent = agent
+    _eval_book = book
+
+def play_worker_games(opponent_depth, game_nums, seed):
+    return play_evaluation_games(_eval_agent, opponent_depth, game_nums, seed, _eval_book)
+
+def evaluate_agent(agent, opponent_depth, num_games=500, metrics=None, book=None, seed=SEED, workers=1):
+    """Evaluate agent performance over specified number of games.
+
+    Progress goes to the `metrics` stream (if given) instead of stdout, every 50 games as they
+    finish. With an opening book the opponent plays book moves instead of searching the opening.
+    Games can be spread over `workers` processes without changing the results for a given seed.
+    """
     results = {'wins': 0, 'losses': 0, 'draws': 0}
-    minimax = MinimaxAI(depth=opponent_depth)
-    
-    for game_num in range(num_games):
-        game = MiniChess()
+
+    def tally(game_num, winner):
         q_plays_white = game_num % 2 == 0
-        
-        while not game.is_game_over():
-            if (game.turn == 'w') == q_plays_white:
-                move = agent.choose_action(game)
-            else:
-                move = minimax.select_move(game)
-            
-            if move is None:
-                break
-            
-            game.make_move(*move)
-        
-        winner = game.get_winner()
         if winner == 'draw':
             results['draws'] += 1
         elif (winner == 'w') == q_plays_white:
             results['wins'] += 1
         else:
             results['losses'] += 1
-            
-        if (game_num + 1) % 50 == 0:  # Progress update every 50 games
-            print(f"Evaluation progress: {game_num + 1}/{num_games} games")
+
+        games = sum(results.values())
+        if metrics is not None and games % 50 == 0:  # Progress update every 50 games
+            metrics.write({'type': 'eval_progress', 'games': games, 'num_games': num_games, **results})
+
+    game_nums = list(range(num_games))
+    if workers > 1:
+        # Chunks of 50 games, tallied as each one finishes so progress keeps streaming
+        chunks = [game_nums[i:i + 50] for i in range(0, num_games, 50)]
+        with ProcessPoolExecutor(workers, initializer=init_eval_worker, initargs=(agent, book)) as executor:
+            futures = {executor.submit(play_worker_games, opponent_depth, chunk, seed): chunk for chunk in chunks}
+            for future in as_completed(futures):
+                for game_num, winner in zip(futures[future], future.result()):
+                    tally(game_num, winner)
+    else:
+        play_evaluation_games(agent, opponent_depth, game_nums, seed, book, on_result=tally)
     
     win_rate = results['wins'] / num_games
     draw_rate = results['draws'] / num_games
     eval_results = (
-            f"\nEvaluation Results (vs depth={opponent_depth}):"
-            f"Wins: {results['wins']}, Losses: {results['losses']}, Draws: {results['draws']}"
-            f"Win Rate: {win_rate:.2%}"
-            f"Draw Rate: {draw_rate:.2%}"
+            f"\nEvaluation Results (vs depth={opponent_depth}):\n"
+            f"Wins: {results['wins']}, Losses: {results['losses']}, Draws: {results['draws']}\n"
+            f"Win Rate: {win_rate:.2%}\n"
+            f"Draw Rate: {draw_rate:.2%}\n"
         )
     
     print(eval_results)
@@ -74,37 +146,61 @@ def evaluate_agent(agent, opponent_depth, num_games=500):
 
     return win_rate
 
-def save_checkpoint(agent, episode, win_rate, metrics):
-    """Save agent checkpoint and training metrics"""
-    # Save agent
-    checkpoint_dir = "saved_models"
-    os.makedirs(checkpoint_dir, exist_ok=True)
-    checkpoint_path = f"{checkpoint_dir}/checkpoint_ep{episode}_wr{win_rate:.2f}.pkl"
-    agent.save(checkpoint_path)
-    
-    # Save metrics
-    metrics_path = f"{checkpoint_dir}/training_metrics.json"
-    with open(metrics_path, 'w') as f:
-        json.dump(metrics, f, indent=4)
+def save_checkpoint(store, agent, episode, win_rate, metrics, opponent_depth, elapsed_time, parent=None):
+    """Add agent checkpoint to the store, append a checkpoint record to the metrics stream
+    and return the checkpoint id"""
+    entry = store.put(
+        agent.model_state(),
+        episode=episode,
+        epsilon=agent.epsilon,
+        eval_results={'win_rate': win_rate, 'opponent_depth': opponent_depth},
+        parent=parent,
+        name=agent.name,
+        table_size=agent.table_size()
+    )
+
+    metrics.write({
+        'type': 'checkpoint',
+        'episode': episode,
+        'win_rate': win_rate,
+        'opponent_depth': opponent_depth,
+        'training_time': elapsed_time,
+        'checkpoint': entry['id']
+    })
+    return entry['id']
 
 def main():
+    os.makedirs(CHECKPOINT_DIR, exist_ok=True)
+    metrics = MetricsWriter(METRICS_PATH)
+    agent = None
     try:
+        if PROFILE_PATH:
+            instrumentation.enable(PROFILE_PATH)
         print("Starting training")
-        agent = QLearningAgent(
-            name="Q-Learner",
-            alpha=0.1,
-            gamma=0.99,
-            epsilon=INITIAL_EPSILON
-        )
+        # Independent streams for the agent, the training loop and evaluation
+        agent_seed, loop_seed, eval_seed = np.random.SeedSequence(SEED).spawn(3)
+        rng = np.random.default_rng(loop_seed)
+        if AGENT_TYPE == "approx":
+            agent = ApproxQLearningAgent(
+                name="ApproxQ-Learner",
+                alpha=0.01,
+                gamma=0.99,
+                epsilon=INITIAL_EPSILON,
+                rng=agent_seed
+            )
+        else:
+            agent = QLearningAgent(
+                name="Q-Learner",
+                alpha=0.1,
+                gamma=0.99,
+                epsilon=INITIAL_EPSILON,
+                max_entries=MAX_TABLE_ENTRIES,
+                rng=agent_seed
+            )
         print("Agent created")
-        
-        metrics = {
-            'episodes': [],
-            'win_rates': [],
-            'opponent_depths': [],
-            'training_times': []
-        }
-        print("Metrics initialized")
+        book = load_book()
+        store = CheckpointStore(f"{CHECKPOINT_DIR}/store")
+        last_checkpoint = None
         
         start_time = time.time()
         last_win_rate = None
@@ -127,12 +223,14 @@ def main():
                 # Training episode
                 # print("Creating new game instance")
                 game = MiniChess()
-                q_plays_white = random.random() < 0.5
+                q_plays_white = rng.random() < 0.5
                 # print(f"Q-learning plays as {'white' if q_plays_white else 'black'}")
                 minimax = MinimaxAI(depth=opponent_depth)
                 # print("Minimax opponent created")
                 
                 move_count = 0
+                episode_reward = 0.0
+                episode_start = time.time()
                 while not game.is_game_over():
                     if (game.turn == 'w') == q_plays_white:
                         action = agent.choose_action(game)
@@ -144,6 +242,7 @@ def main():
                         game.make_move(*action)
                         reward = agent.get_reward(old_game, action, game, 'w' if q_plays_white else 'b')
                         agent.learn(old_game, action, reward, game.copy())
+                        episode_reward += reward
                     else:
                         move = minimax.select_move(game)
                         if move:
@@ -160,7 +259,7 @@ def main():
                             else:
                                 print("WARNING: Minimax returned None despite legal moves")
                                 if legal_moves:
-                                    move = random.choice(legal_moves)
+                                    move = legal_moves[rng.integers(len(legal_moves))]
                                     print(f"Using fallback random legal move: {move}")
                                     game.make_move(*move)
                                 else:
@@ -176,33 +275,48 @@ def main():
                 traceback.print_exc()
                 break
             
+            episode_time = time.time() - episode_start
+            metrics.write({
+                'type': 'episode',
+                'episode': episode,
+                'length': move_count,
+                'reward': episode_reward,
+                'epsilon': agent.epsilon,
+                'table_size': agent.table_size(),
+                'evictions': agent.evictions,
+                'episodes_per_sec': 1.0 / episode_time if episode_time > 0 else None
+            })
+
             # Decay epsilon
             agent.epsilon = max(MIN_EPSILON, agent.epsilon * EPSILON_DECAY)
             
             # Evaluation and checkpointing
             if episode % eval_freq == 0:
                 elapsed_time = time.time() - start_time
-                win_rate = evaluate_agent(agent, opponent_depth)
+                win_rate = evaluate_agent(agent, opponent_depth, metrics=metrics, book=book,
+                                          seed=eval_seed, workers=EVAL_WORKERS)
 
                 status_text = (
-                    (f"\n{'='*50}")
-                    (f"Episode {episode}/{TOTAL_EPISODES} ({episode/TOTAL_EPISODES:.1%})")
-                    (f"Training time: {elapsed_time/3600:.1f} hours")
-                    (f"Current ε: {agent.epsilon:.3f}")
-                    (f"Opponent depth: {opponent_depth}")
+                    f"\n{'='*50}\n"
+                    f"Episode {episode}/{TOTAL_EPISODES} ({episode/TOTAL_EPISODES:.1%})\n"
+                    f"Training time: {elapsed_time/3600:.1f} hours\n"
+                    f"Current ε: {agent.epsilon:.3f}\n"
+                    f"Opponent depth: {opponent_depth}\n"
+                    f"Table size: {agent.table_size()} ({agent.evictions} evicted)\n"
                 )
+                if isinstance(agent, ApproxQLearningAgent):
+                    stats = agent.inference_stats()
+                    status_text += (
+                        f"Inference: {stats['us_per_move']:.1f} us/move, "
+                        f"{stats['us_per_position']:.1f} us/position\n"
+                    )
                 
                 print(status_text)
                 agent.write_to_file(status_text)
                 
-                # Record metrics
-                metrics['episodes'].append(episode)
-                metrics['win_rates'].append(win_rate)
-                metrics['opponent_depths'].append(opponent_depth)
-                metrics['training_times'].append(elapsed_time)
-                
                 # Save checkpoint
-                save_checkpoint(agent, episode, win_rate, metrics)
+                last_checkpoint = save_checkpoint(store, agent, episode, win_rate, metrics,
+                                                  opponent_depth, elapsed_time, parent=last_checkpoint)
                 
                 # Check for improvement and early stopping
                 if episode > 30_000 and opponent_depth >= 1:
@@ -214,6 +328,11 @@ def main():
     except Exception as e:
         print(f"Fatal error in main: {str(e)}")  
         traceback.print_exc()
+    finally:
+        metrics.close()
+        if agent is not None:
+            agent.close_log()
+        instrumentation.disable()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,216 @@
+"""Local move server: one warm agent answering "best move for these positions" over a socket.
+
+The protocol is newline-delimited JSON. A request is
+    {"id": 1, "positions": [{"board": [[".", "bR", ...], ...], "turn": "w"}, ...]}
+and is answered with
+    {"id": 1, "moves": [[[fx, fy], [tx, ty]], null, ...]}
+({"id": 2, "stats": true} returns latency percentiles instead, and a request that can't be
+answered gets {"id": 1, "error": "..."}). Requests arriving within a
+short window are coalesced into one batch, and identical positions within a batch are only
+searched once.
+"""
+import json
+import time
+import socket
+import asyncio
+from collections import deque
+import numpy as np
+
+from chess_logic.chess_5x5 import MiniChess
+
+PIECES = {'.'} | {color + piece for color in 'wb' for piece in 'KQRBNP'}
+
+def validate_positions(positions):
+    """Reason the positions of a request are malformed, or None when they are fine"""
+    if not isinstance(positions, list):
+        return "positions must be a list"
+    for i, position in enumerate(positions):
+        if not isinstance(position, dict):
+            return f"position {i} must be an object"
+        if position.get('turn') not in ('w', 'b'):
+            return f"position {i}: turn must be 'w' or 'b'"
+        board = position.get('board')
+        if not (isinstance(board, list) and len(board) == 5
+                and all(isinstance(row, list) and len(row) == 5 for row in board)):
+            return f"position {i}: board must be 5 rows of 5 squares"
+        if any(square not in PIECES for row in board for square in row):
+            return f"position {i}: unknown piece code"
+    return None
+
+def position_key(position):
+    return ''.join(''.join(row) for row in position['board']) + position['turn']
+
+def encode_position(game):
+    return {'board': [list(row) for row in game.board], 'turn': game.turn}
+
+def decode_move(move):
+    if move is None:
+        return None
+    (fx, fy), (tx, ty) = move
+    return (fx, fy), (tx, ty)
+
+class MoveServer:
+    def __init__(self, agent, batch_window=0.005, max_batch=256, report_interval=60.0):
+        self.agent = agent
+        self.agent.epsilon = 0.0  # Serve greedy moves
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.report_interval = report_interval
+        self.pending = None  # asyncio.Queue, created on the server's loop
+        self.latencies = deque(maxlen=10000)
+        self.requests = 0
+        self.positions = 0
+        self.searched = 0
+
+    def stats(self):
+        latencies = np.array(self.latencies) * 1000 if self.latencies else np.zeros(1)
+        p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+        return {
+            'requests': self.requests,
+            'positions': self.positions,
+            'searched': self.searched,  # Positions left after coalescing
+            'p50_ms': p50,
+            'p90_ms': p90,
+            'p99_ms': p99
+        }
+
+    def best_moves(self, games):
+        return [self.agent.choose_action(game) for game in games]
+
+    async def handle_client(self, reader, writer):
+        tasks = set()
+        try:
+            while line := await reader.readline():
+                try:
+                    request = json.loads(line)
+                except json.JSONDecodeError:
+                    request = {'error': "request is not valid JSON"}
+                if not isinstance(request, dict):
+                    request = {'error': "request must be a JSON object"}
+                task = asyncio.create_task(self.answer(request, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        finally:
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+            writer.close()
+
+    async def answer(self, request, writer):
+        error = request.get('error') or (None if request.get('stats') else validate_positions(request.get('positions')))
+        if error:
+            response = {'id': request.get('id'), 'error': error}
+        elif request.get('stats'):
+            response = {'id': request.get('id'), 'stats': self.stats()}
+        else:
+            start = time.perf_counter()
+            future = asyncio.get_running_loop().create_future()
+            await self.pending.put((request['positions'], future))
+            try:
+                moves = await future
+                self.latencies.append(time.perf_counter() - start)
+                self.requests += 1
+                response = {'id': request.get('id'), 'moves': moves}
+            except Exception as e:
+                response = {'id': request.get('id'), 'error': f"{type(e).__name__}: {e}"}
+        writer.write((json.dumps(response) + "\n").encode())
+        await writer.drain()
+
+    async def batcher(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.pending.get()]
+            count = len(batch[0][0])
+            deadline = loop.time() + self.batch_window
+            while count < self.max_batch:
+                try:
+                    item = await asyncio.wait_for(self.pending.get(), max(deadline - loop.time(), 0))
+                except asyncio.TimeoutError:
+                    break
+                batch.append(item)
+                count += len(item[0])
+
+            self.positions += count
+            try:
+                await self.resolve(batch)
+            except Exception:
+                # Retry request by request, so only the ones that actually fail get the error
+                for item in batch:
+                    try:
+                        await self.resolve([item])
+                    except Exception as e:
+                        if not item[1].done():
+                            item[1].set_exception(e)
+
+    async def resolve(self, batch):
+        """Search the batch, coalescing identical positions across all of its requests"""
+        unique = {}
+        for positions, _ in batch:
+            for position in positions:
+                unique.setdefault(position_key(position), position)
+        keys = list(unique)
+        games = [MiniChess.from_board(unique[key]['board'], unique[key]['turn']) for key in keys]
+        moves = await asyncio.get_running_loop().run_in_executor(None, self.best_moves, games)
+        by_key = dict(zip(keys, moves))
+
+        self.searched += len(keys)
+        for positions, future in batch:
+            if not future.done():
+                future.set_result([by_key[position_key(position)] for position in positions])
+
+    async def reporter(self):
+        while True:
+            await asyncio.sleep(self.report_interval)
+            stats = self.stats()
+            print(f"[server] {stats['requests']} requests, {stats['positions']} positions "
+                  f"({stats['searched']} searched), p50 {stats['p50_ms']:.2f}ms "
+                  f"p90 {stats['p90_ms']:.2f}ms p99 {stats['p99_ms']:.2f}ms")
+
+    async def serve(self, host='127.0.0.1', port=8765, unix_path=None):
+        self.pending = asyncio.Queue()
+        if unix_path:
+            server = await asyncio.start_unix_server(self.handle_client, path=unix_path)
+        else:
+            server = await asyncio.start_server(self.handle_client, host, port)
+        print(f"[INFO] Move server listening on {unix_path or f'{host}:{port}'}")
+        async with server:
+            await asyncio.gather(server.serve_forever(), self.batcher(), self.reporter())
+
+class MoveClient:
+    """Blocking client with the agent interface, so it can stand in for an agent in
+    evaluate_agent or match_sim"""
+    def __init__(self, host='127.0.0.1', port=8765, unix_path=None, name="remote"):
+        if unix_path:
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.connect(unix_path)
+        else:
+            self.sock = socket.create_connection((host, port))
+        self.file = self.sock.makefile('rw')
+        self.name = name
+        self.next_id = 0
+        self.rng = None  # Set by evaluate_agent per game, ignored: the server plays greedy moves
+
+    def request(self, payload):
+        self.next_id += 1
+        payload['id'] = self.next_id
+        self.file.write(json.dumps(payload) + "\n")
+        self.file.flush()
+        return json.loads(self.file.readline())
+
+    def best_moves(self, games):
+        response = self.request({'positions': [encode_position(game) for game in games]})
+        if 'error' in response:
+            raise ValueError(f"Move server error: {response['error']}")
+        return [decode_move(move) for move in response['moves']]
+
+    def choose_action(self, game):
+        return self.best_moves([game])[0]
+
+    def write_to_file(self, text):
+        pass  # The server owns the agent's log
+
+    def stats(self):
+        return self.request({'stats': True})['stats']
+
+    def close(self):
+        self.file.close()
+        self.sock.close()
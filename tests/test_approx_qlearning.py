@@ -0,0 +1,27 @@
+import sys
+from pathlib import Path
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+import numpy as np
+from chess_logic.chess_5x5 import MiniChess
+from models.approx_qlearning import ApproxQLearningAgent, NUM_FEATURES
+
+def test_opponent_winning_reply_lowers_q():
+    # White has only a king against king and rook, so every black reply keeps black winning
+    board = [['.'] * 5 for _ in range(5)]
+    board[0][0], board[0][4], board[4][2] = 'bR', 'bK', 'wK'
+    game = MiniChess.from_board(board, 'w')
+    action = game.get_legal_moves()[0]
+    new_game = game.copy()
+    new_game.make_move(*action)
+
+    # Linear network worth 1 plus 1 for owning a rook, so the mover with the rook is ahead
+    agent = ApproxQLearningAgent(alpha=0.1, batch_size=1, train_every=1, hidden_size=1, rng=0)
+    W1 = np.zeros((NUM_FEATURES, 1))
+    W1[25:50] = 1.0  # Own rook plane
+    agent.weights = {'W1': W1, 'b1': np.ones(1), 'W2': np.ones(1), 'b2': np.zeros(1)}
+
+    before = agent.q_values(game, [action])[0]
+    agent.learn(game, action, 0.0, new_game)
+    assert agent.q_values(game, [action])[0] < before
@@ -0,0 +1,43 @@
+import sys
+import random
+from pathlib import Path
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+import pytest
+import models.qlearning as qlearning
+from chess_logic.chess_5x5 import MiniChess
+from models.qlearning import QLearningAgent
+
+def replay_deltas(agent, seed, max_plies=80):
+    """Play a seeded random game and yield (incremental delta, full-scan delta) for both colours"""
+    rng = random.Random(seed)
+    game = MiniChess()
+    for _ in range(max_plies):
+        if game.is_game_over():
+            break
+        action = rng.choice(game.get_legal_moves())
+        old_game = game.copy()
+        game.make_move(*action)
+        for perspective in 'wb':
+            expected = agent.evaluate_position(game, perspective) - agent.evaluate_position(old_game, perspective)
+            yield agent.position_delta(old_game, action, perspective), expected
+
+@pytest.mark.parametrize("seed", range(20))
+def test_position_delta_matches_full_evaluation(seed):
+    agent = QLearningAgent()
+    for delta, expected in replay_deltas(agent, seed):
+        assert delta == pytest.approx(expected, abs=1e-9)
+
+@pytest.mark.parametrize("seed", range(20))
+def test_position_delta_matches_with_king_value(monkeypatch, seed):
+    # With the default king value of 0 the king-safety branch never runs
+    king_values = dict(qlearning.PIECE_VALUES, K=4)
+    monkeypatch.setattr(qlearning, 'PIECE_VALUES', king_values)
+    monkeypatch.setattr(qlearning, 'PIECE_SQUARE', qlearning.build_piece_square(king_values))
+
+    agent = QLearningAgent()
+    deltas = list(replay_deltas(agent, seed))
+    assert deltas
+    for delta, expected in deltas:
+        assert delta == pytest.approx(expected, abs=1e-9)